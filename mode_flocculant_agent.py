@@ -1,7 +1,7 @@
 import streamlit as st
 from fpdf import FPDF
 import pandas as pd
-import base64
+import xlsxwriter
 import io
 from typing import Dict, List, Tuple, Optional
 import logging
@@ -29,6 +29,27 @@ UNIT_CONFIGS = {
     "Weight (g) / % w/w": {"unit": "g", "conc_unit": "% w/w"},
     "Volume (mL) / % v/v": {"unit": "mL", "conc_unit": "% v/v"}
 }
+_DEFAULT_UNIT_CFG = UNIT_CONFIGS["Weight (g) / % w/w"]
+
+# Summary labels, in the order of the stock then dilution records
+SUMMARY_PARAMETERS = (
+    "Stock Amount", "Stock Concentration", "Emulsion Required", "Water for Stock",
+    "Final Amount", "Final Concentration", "Stock Solution Used", "Water for Dilution"
+)
+
+# Excel "Final Dilution" sheet labels, which differ from the PDF's records
+DILUTION_SHEET_PARAMETERS = ("Final Amount", "Final Concentration", "Stock Used", "Water Added")
+
+# Session state defaults, merged once at import time
+_DEFAULTS_ITEMS = tuple({
+    "mode": "Manual Input",
+    "unit_type": "Weight (g) / % w/w",
+    "step1_completed": False,
+    "step2_completed": False,
+    "stock_calculations": {},
+    "dilution_calculations": {},
+    **DEFAULT_VALUES
+}.items())
 
 # ========== FUNCTIONS ==========
 def calculate_solution(amount: float, concentration: float) -> Tuple[float, float]:
@@ -42,21 +63,16 @@ def calculate_solution(amount: float, concentration: float) -> Tuple[float, floa
     Returns:
         Tuple of (solute_amount, solvent_amount)
     """
-    try:
-        if amount <= 0 or concentration <= 0:
-            raise ValueError("Amount and concentration must be positive")
-            
-        fraction = concentration / 100.0
-        solute_amount = amount * fraction
-        solvent_amount = amount - solute_amount
-        
-        logger.info(f"Calculated: {solute_amount:.2f} solute, {solvent_amount:.2f} solvent")
-        return solute_amount, solvent_amount
-        
-    except Exception as e:
-        logger.error(f"Calculation error: {str(e)}")
-        st.error(f"Calculation error: {str(e)}")
+    if amount <= 0 or concentration <= 0:
+        logger.error("Calculation error: Amount and concentration must be positive")
         return 0.0, 0.0
+    
+    solute_amount = amount * concentration / 100.0
+    solvent_amount = amount - solute_amount
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"Calculated: {solute_amount:.2f} solute, {solvent_amount:.2f} solvent")
+    return solute_amount, solvent_amount
 
 def validate_inputs(amount: float, concentration: float, step_name: str) -> List[str]:
     """
@@ -70,15 +86,13 @@ def validate_inputs(amount: float, concentration: float, step_name: str) -> List
     Returns:
         List of error messages (empty if valid)
     """
-    errors = []
-    
     # Basic validation
-    if amount <= 0:
-        errors.append(f"{step_name}: Amount must be greater than 0")
-    if concentration <= 0:
-        errors.append(f"{step_name}: Concentration must be greater than 0")
-    if concentration >= 100:
-        errors.append(f"{step_name}: Concentration must be less than 100%")
+    checks = (
+        (amount <= 0, "Amount must be greater than 0"),
+        (concentration <= 0, "Concentration must be greater than 0"),
+        (concentration >= 100, "Concentration must be less than 100%"),
+    )
+    errors = [f"{step_name}: {message}" for failed, message in checks if failed]
     
     # Cross-step validation for final dilution
     if step_name == "Final Dilution" and 'stock_conc' in st.session_state:
@@ -94,16 +108,17 @@ def validate_inputs(amount: float, concentration: float, step_name: str) -> List
 class EnhancedPDF(FPDF):
     """Enhanced PDF class with better formatting and error handling."""
     
-    def __init__(self):
+    def __init__(self, generated_at: str):
         super().__init__()
         self.set_auto_page_break(auto=True, margin=15)
+        self._generated_at = generated_at
     
     def header(self):
         """Add header to each page."""
         self.set_font("Arial", 'B', 16)
         self.cell(0, 15, "Flocculant Preparation Report", ln=True, align='C')
         self.set_font("Arial", 'I', 10)
-        self.cell(0, 10, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C')
+        self.cell(0, 10, f"Generated: {self._generated_at}", ln=True, align='C')
         self.ln(5)
 
     def footer(self):
@@ -125,13 +140,76 @@ class EnhancedPDF(FPDF):
         self.cell(110, 8, "Value", border=1, align='C', ln=True)
         
         self.set_font("Arial", size=10)
+        cell = self.cell
         for param, value in data:
-            self.cell(70, 6, str(param), border=1)
-            self.cell(110, 6, str(value), border=1, ln=True)
+            cell(70, 6, param, border=1)
+            cell(110, 6, value, border=1, ln=True)
         self.ln(4)
 
+@st.cache_data(max_entries=8, show_spinner=False)
+def _build_pdf_bytes(title: str, stock_records: Tuple[Tuple[str, str, str], ...],
+                     dilution_records: Tuple[Tuple[str, str, str], ...],
+                     summary_rows: Tuple[Tuple[str, str], ...], mode_used: str,
+                     unit_type: str, generated_at: str) -> bytes:
+    """
+    Render the PDF report. Cached so repeat exports with unchanged inputs,
+    which share one generation timestamp, skip fpdf rendering entirely.
+    
+    Args:
+        title: Report title
+        stock_records: Stock solution (parameter, value, unit) rows
+        dilution_records: Dilution (parameter, value, unit) rows
+        summary_rows: Summary (parameter, value) rows
+        mode_used: Preparation mode used
+        unit_type: Unit system shown in the report metadata
+        generated_at: Generation timestamp printed in the page header
+        
+    Returns:
+        Raw PDF bytes
+    """
+    pdf = EnhancedPDF(generated_at)
+    pdf.add_page()
+    
+    # Title and metadata
+    pdf.add_section_title(title)
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 8, f"Preparation Mode: {mode_used}", ln=True)
+    pdf.cell(0, 8, f"Units: {unit_type}", ln=True)
+    pdf.ln(4)
+    
+    # Summary table
+    pdf.add_section_title("Summary")
+    pdf.add_parameter_table(summary_rows)
+    
+    # Stock solution details
+    pdf.add_section_title("Step 1: Stock Solution Preparation")
+    pdf.set_font("Arial", size=10)
+    stock_data = [(param, f"{value} {unit}") for param, value, unit in stock_records]
+    pdf.add_parameter_table(stock_data)
+    
+    # Final dilution details
+    pdf.add_section_title("Step 2: Final Dilution")
+    dilution_data = [(param, f"{value} {unit}") for param, value, unit in dilution_records]
+    pdf.add_parameter_table(dilution_data)
+    
+    # Safety notes
+    pdf.add_section_title("Safety and Quality Notes")
+    pdf.set_font("Arial", size=9)
+    safety_notes = [
+        "• Use DI water with 10-15 g/L NaOH for makeup water",
+        "• Mix emulsion thoroughly in alkaline solution",
+        "• Always add water first, then stock solution",
+        "• Use vessel at least 2x the final volume",
+        "• Match plant water conditions where possible"
+    ]
+    for note in safety_notes:
+        pdf.multi_cell(0, 5, note)
+    
+    return pdf.output(dest='S').encode('latin1')
+
 def generate_pdf(title: str, stock_info: Dict, dilution_info: Dict, 
-                summary_df: pd.DataFrame, mode_used: str) -> str:
+                summary_rows: List[Tuple[str, str]], mode_used: str,
+                generated_at: str) -> bytes:
     """
     Generate PDF report with enhanced formatting and error handling.
     
@@ -139,162 +217,111 @@ def generate_pdf(title: str, stock_info: Dict, dilution_info: Dict,
         title: Report title
         stock_info: Stock solution information
         dilution_info: Dilution information
-        summary_df: Summary dataframe
+        summary_rows: Summary (parameter, value) rows
         mode_used: Preparation mode used
+        generated_at: Generation timestamp printed in the page header
         
     Returns:
-        HTML link for PDF download or empty string on error
+        PDF bytes for download or empty bytes on error
     """
     try:
-        pdf = EnhancedPDF()
-        pdf.add_page()
-        
-        # Title and metadata
-        pdf.add_section_title(title)
-        pdf.set_font("Arial", size=10)
-        pdf.cell(0, 8, f"Preparation Mode: {mode_used}", ln=True)
-        pdf.cell(0, 8, f"Units: {st.session_state.get('unit_type', 'N/A')}", ln=True)
-        pdf.ln(4)
-        
-        # Summary table
-        pdf.add_section_title("Summary")
-        summary_data = [(row['Parameter'], row['Value']) for _, row in summary_df.iterrows()]
-        pdf.add_parameter_table(summary_data)
-        
-        # Stock solution details
-        pdf.add_section_title("Step 1: Stock Solution Preparation")
-        pdf.set_font("Arial", size=10)
-        stock_data = [
-            ("Target Amount", f"{stock_info['stock_amount']:.2f} {stock_info.get('unit', 'g')}"),
-            ("Target Concentration", f"{stock_info['stock_conc']:.2f} {stock_info.get('conc_unit', '%')}"),
-            ("Emulsion Required", f"{stock_info['emulsion_needed']:.2f} {stock_info.get('unit', 'g')}"),
-            ("Water Required", f"{stock_info['water_needed']:.2f} {stock_info.get('unit', 'g')}")
-        ]
-        pdf.add_parameter_table(stock_data)
-        
-        # Final dilution details
-        pdf.add_section_title("Step 2: Final Dilution")
-        dilution_data = [
-            ("Final Amount", f"{dilution_info['final_amount']:.2f} {dilution_info.get('unit', 'g')}"),
-            ("Final Concentration", f"{dilution_info['final_conc']:.2f} {dilution_info.get('conc_unit', '%')}"),
-            ("Stock Solution Used", f"{dilution_info['stock_needed']:.2f} {dilution_info.get('unit', 'g')}"),
-            ("Water Added", f"{dilution_info['water_needed']:.2f} {dilution_info.get('unit', 'g')}")
-        ]
-        pdf.add_parameter_table(dilution_data)
-        
-        # Safety notes
-        pdf.add_section_title("Safety and Quality Notes")
-        pdf.set_font("Arial", size=9)
-        safety_notes = [
-            "• Use DI water with 10-15 g/L NaOH for makeup water",
-            "• Mix emulsion thoroughly in alkaline solution",
-            "• Always add water first, then stock solution",
-            "• Use vessel at least 2x the final volume",
-            "• Match plant water conditions where possible"
-        ]
-        for note in safety_notes:
-            pdf.multi_cell(0, 5, note)
-        
-        # Generate download link
-        pdf_bytes = pdf.output(dest='S').encode('latin1')
-        b64 = base64.b64encode(pdf_bytes).decode()
-        filename = f"flocculant_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        return f'<a href="data:application/pdf;base64,{b64}" download="{filename}">📄 Download PDF Report</a>'
+        return _build_pdf_bytes(title, stock_info['records'], dilution_info['records'],
+                                tuple(summary_rows), mode_used,
+                                st.session_state.get('unit_type', 'N/A'), generated_at)
         
     except Exception as e:
         logger.error(f"PDF generation failed: {str(e)}")
         st.error(f"PDF generation failed: {str(e)}")
-        return ""
+        return b""
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _build_xlsx_bytes(summary_rows: Tuple[Tuple[str, str], ...],
+                      stock_records: Tuple[Tuple[str, str, str], ...],
+                      dilution_records: Tuple[Tuple[str, str, str], ...]) -> bytes:
+    """
+    Write the Excel workbook. Cached so repeat exports with unchanged inputs
+    skip xlsxwriter entirely.
+    
+    Args:
+        summary_rows: Summary (parameter, value) rows
+        stock_records: Stock solution (parameter, value, unit) rows
+        dilution_records: Dilution (parameter, value, unit) rows
+        
+    Returns:
+        Raw workbook bytes
+    """
+    output = io.BytesIO()
+    dilution_rows = [(param, value, unit) for param, (_, value, unit)
+                     in zip(DILUTION_SHEET_PARAMETERS, dilution_records)]
+    
+    # Rows for each sheet
+    sheets = [
+        ('Summary', ('Parameter', 'Value'), summary_rows),
+        ('Stock Solution', ('Parameter', 'Value', 'Unit'), stock_records),
+        ('Final Dilution', ('Parameter', 'Value', 'Unit'), dilution_rows)
+    ]
+    
+    # constant_memory is ignored alongside in_memory and spools rows
+    # through temp files; for sheets this small in_memory is faster.
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#D7E4BC'})
+    
+    # Write and format each sheet
+    for sheet_name, headers, rows in sheets:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.set_column('A:C', 20)
+        worksheet.write_row(0, 0, headers, header_format)
+        for row_num, row in enumerate(rows, start=1):
+            worksheet.write_row(row_num, 0, row)
+    
+    workbook.close()
+    return output.getvalue()
 
-def generate_excel(summary_df: pd.DataFrame, stock_info: Dict, dilution_info: Dict) -> str:
+def generate_excel(summary_rows: List[Tuple[str, str]], stock_info: Dict, dilution_info: Dict) -> bytes:
     """
     Generate Excel report with multiple sheets and enhanced data.
     
     Args:
-        summary_df: Summary dataframe
+        summary_rows: Summary (parameter, value) rows
         stock_info: Stock solution information
         dilution_info: Dilution information
         
     Returns:
-        HTML link for Excel download or empty string on error
+        Excel workbook bytes for download or empty bytes on error
     """
     try:
-        output = io.BytesIO()
-        
-        # Create detailed dataframes for each sheet
-        stock_df = pd.DataFrame({
-            'Parameter': ['Target Amount', 'Target Concentration', 'Emulsion Required', 'Water Required'],
-            'Value': [
-                f"{stock_info['stock_amount']:.2f}",
-                f"{stock_info['stock_conc']:.2f}",
-                f"{stock_info['emulsion_needed']:.2f}",
-                f"{stock_info['water_needed']:.2f}"
-            ],
-            'Unit': [
-                stock_info.get('unit', 'g'),
-                stock_info.get('conc_unit', '%'),
-                stock_info.get('unit', 'g'),
-                stock_info.get('unit', 'g')
-            ]
-        })
-        
-        dilution_df = pd.DataFrame({
-            'Parameter': ['Final Amount', 'Final Concentration', 'Stock Used', 'Water Added'],
-            'Value': [
-                f"{dilution_info['final_amount']:.2f}",
-                f"{dilution_info['final_conc']:.2f}",
-                f"{dilution_info['stock_needed']:.2f}",
-                f"{dilution_info['water_needed']:.2f}"
-            ],
-            'Unit': [
-                dilution_info.get('unit', 'g'),
-                dilution_info.get('conc_unit', '%'),
-                dilution_info.get('unit', 'g'),
-                dilution_info.get('unit', 'g')
-            ]
-        })
-        
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Write multiple sheets
-            summary_df.to_excel(writer, index=False, sheet_name='Summary')
-            stock_df.to_excel(writer, index=False, sheet_name='Stock Solution')
-            dilution_df.to_excel(writer, index=False, sheet_name='Final Dilution')
-            
-            # Format the worksheets
-            workbook = writer.book
-            header_format = workbook.add_format({'bold': True, 'bg_color': '#D7E4BC'})
-            
-            for sheet_name in ['Summary', 'Stock Solution', 'Final Dilution']:
-                worksheet = writer.sheets[sheet_name]
-                worksheet.set_row(0, None, header_format)
-                worksheet.set_column('A:C', 20)
-        
-        output.seek(0)
-        b64 = base64.b64encode(output.read()).decode()
-        filename = f"flocculant_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        
-        return f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}">📊 Download Excel Summary</a>'
+        return _build_xlsx_bytes(tuple(summary_rows), stock_info['records'], dilution_info['records'])
         
     except Exception as e:
         logger.error(f"Excel generation failed: {str(e)}")
         st.error(f"Excel generation failed: {str(e)}")
-        return ""
+        return b""
+
+def _build_summary_rows(stock_records: Tuple[Tuple[str, str, str], ...],
+                        dilution_records: Tuple[Tuple[str, str, str], ...]
+                        ) -> Tuple[Tuple[str, str], ...]:
+    """
+    Build the summary (parameter, value) rows from the step records.
+    
+    Args:
+        stock_records: Stock solution (parameter, value, unit) rows
+        dilution_records: Dilution (parameter, value, unit) rows
+        
+    Returns:
+        Summary (parameter, value) rows
+    """
+    summary_values = [f"{value} {unit}" for _, value, unit in stock_records + dilution_records]
+    return tuple(zip(SUMMARY_PARAMETERS, summary_values))
 
 def init_session_state():
     """Initialize session state with default values."""
-    defaults = {
-        "mode": "Manual Input",
-        "unit_type": "Weight (g) / % w/w",
-        "step1_completed": False,
-        "step2_completed": False,
-        "stock_calculations": {},
-        "dilution_calculations": {},
-        **DEFAULT_VALUES
-    }
-    
-    for key, value in defaults.items():
-        st.session_state.setdefault(key, value)
+    # Defaults only need applying on a session's first run
+    if st.session_state.get("_state_initialized"):
+        return
+    # Copy dict defaults so sessions never share the import-time objects
+    for key, value in _DEFAULTS_ITEMS:
+        st.session_state.setdefault(key, value.copy() if isinstance(value, dict) else value)
+    st.session_state["_state_initialized"] = True
 
 def reset_calculations():
     """Reset calculation results when inputs change."""
@@ -305,7 +332,65 @@ def reset_calculations():
 
 def get_unit_config() -> Dict[str, str]:
     """Get current unit configuration."""
-    return UNIT_CONFIGS.get(st.session_state.unit_type, UNIT_CONFIGS["Weight (g) / % w/w"])
+    return UNIT_CONFIGS.get(st.session_state.unit_type, _DEFAULT_UNIT_CFG)
+
+def get_export_timestamp(export_key: Tuple) -> datetime:
+    """
+    Get the generation time shared by all reports for the given inputs.
+    
+    Recorded on the first export for export_key, so the PDF header and both
+    report filenames carry the same timestamp across separate clicks.
+    """
+    stamp = st.session_state.get("export_timestamp")
+    if not stamp or stamp[0] != export_key:
+        stamp = (export_key, datetime.now())
+        st.session_state.export_timestamp = stamp
+    return stamp[1]
+
+@st.fragment
+def render_sidebar():
+    """
+    Render the help sidebar and reset button.
+    
+    Runs as a fragment, so a reset click reruns only the sidebar before its
+    single st.rerun() instead of executing the whole script twice.
+    """
+    st.markdown("#### 📖 Help & Guidelines")
+    
+    st.markdown("##### 💧 Makeup Water")
+    st.info("Use DI or Plant water with 10–15 g/L NaOH. Match plant water conditions when possible.")
+    
+    st.markdown("##### 📘 Stock Solution Tips")
+    st.markdown("""
+    - Mix emulsion in alkaline solution (10 g/L NaOH)
+    - Target concentration: 0.5–1.0% w/w
+    - Ensure complete dissolution
+    - Store in appropriate containers
+    """)
+    
+    st.markdown("##### 📙 Final Dilution Tips")
+    st.markdown("""
+    - Always prepare working solutions fresh
+    - Typical working concentration: 
+                from emulsion : 0.1%
+                from dy       : 0.03%
+    - **Always add water first, then stock**
+    - Use vessel capacity  twice final volume
+    - Mix thoroughly ensure proper mixing, no lumps ( fish eyes)
+    """)
+    
+    st.markdown("##### ⚠️ Safety Reminders")
+    st.warning("""
+    - Wear appropriate PPE.
+    - Follow local safety protocols
+    """)
+    
+    # Reset button
+    st.markdown("---")
+    if st.button("🔄 Reset All Calculations"):
+        reset_calculations()
+        st.success("All calculations reset!")
+        st.rerun()
 
 # ========== MAIN APPLICATION ==========
 def main():
@@ -330,42 +415,7 @@ def main():
     
     # ========== SIDEBAR (Available from start) ==========
     with st.sidebar:
-        st.markdown("#### 📖 Help & Guidelines")
-        
-        st.markdown("##### 💧 Makeup Water")
-        st.info("Use DI or Plant water with 10–15 g/L NaOH. Match plant water conditions when possible.")
-        
-        st.markdown("##### 📘 Stock Solution Tips")
-        st.markdown("""
-        - Mix emulsion in alkaline solution (10 g/L NaOH)
-        - Target concentration: 0.5–1.0% w/w
-        - Ensure complete dissolution
-        - Store in appropriate containers
-        """)
-        
-        st.markdown("##### 📙 Final Dilution Tips")
-        st.markdown("""
-        - Always prepare working solutions fresh
-        - Typical working concentration: 
-                    from emulsion : 0.1%
-                    from dy       : 0.03%
-        - **Always add water first, then stock**
-        - Use vessel capacity  twice final volume
-        - Mix thoroughly ensure proper mixing, no lumps ( fish eyes)
-        """)
-        
-        st.markdown("##### ⚠️ Safety Reminders")
-        st.warning("""
-        - Wear appropriate PPE.
-        - Follow local safety protocols
-        """)
-        
-        # Reset button
-        st.markdown("---")
-        if st.button("🔄 Reset All Calculations"):
-            reset_calculations()
-            st.success("All calculations reset!")
-            st.rerun()
+        render_sidebar()
     
     # ========== MODE & UNITS SELECTION ==========
     st.markdown("#### 🧭 Preparation Mode")
@@ -454,7 +504,18 @@ def main():
                     'stock_amount': st.session_state.stock_amount,
                     'stock_conc': st.session_state.stock_conc,
                     'unit': unit,
-                    'conc_unit': conc_unit
+                    'conc_unit': conc_unit,
+                    # Display strings, formatted once per calculation
+                    'emulsion_fmt': f"{emulsion:.2f} {unit}",
+                    'water_fmt': f"{water:.2f} {unit}",
+                    'stock_amount_fmt': f"{st.session_state.stock_amount:.2f} {unit}",
+                    # (Parameter, Value, Unit) rows shared by the PDF and Excel reports
+                    'records': (
+                        ('Target Amount', f"{st.session_state.stock_amount:.2f}", unit),
+                        ('Target Concentration', f"{st.session_state.stock_conc:.2f}", conc_unit),
+                        ('Emulsion Required', f"{emulsion:.2f}", unit),
+                        ('Water Required', f"{water:.2f}", unit)
+                    )
                 }
                 st.session_state.step1_completed = True
         
@@ -465,11 +526,11 @@ def main():
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Emulsion Required", f"{calc['emulsion_needed']:.2f} {unit}")
+                st.metric("Emulsion Required", calc['emulsion_fmt'])
             with col2:
-                st.metric("Water Required", f"{calc['water_needed']:.2f} {unit}")
+                st.metric("Water Required", calc['water_fmt'])
             with col3:
-                st.metric("Total Volume", f"{calc['stock_amount']:.2f} {unit}")
+                st.metric("Total Volume", calc['stock_amount_fmt'])
             
             # Instructions
             st.markdown("##### 📋 Preparation Instructions")
@@ -477,9 +538,9 @@ def main():
 
             st.markdown(f"""
             1. **Prepare alkaline water**: Add 10–15 g/L NaOH to DI or plant water.  
-            2. **Set up beaker**: Use a **{beaker_volume:.0f}** ml beaker and add **{calc['water_needed']:.2f} {unit}** of alkaline water.  
+            2. **Set up beaker**: Use a **{beaker_volume:.0f}** ml beaker and add **{calc['water_fmt']}** of alkaline water.  
             3. **Start vortex mixing**: on a plate, overhead or hand mixer use 700–900 RPM.  
-            4. **Add emulsion**: Slowly inject **{calc['emulsion_needed']:.2f} {unit}** of flocculant into the vortex shoulder.  
+            4. **Add emulsion**: Slowly inject **{calc['emulsion_fmt']}** of flocculant into the vortex shoulder.  
             5. **Mix thoroughly**: Continue mixing for **30 min** to ensure complete dissolution.  
             6. **Aging**: let the stock solution rest 2 hours under agitation **200 -300** rpm. 
             7. **Strorage** : transfer into a **{calc['stock_amount']:.0f}** ml bottle place the lid, label and use not later than 24 hours.
@@ -556,7 +617,18 @@ def main():
                         'final_amount': final_amount,
                         'final_conc': final_conc,
                         'unit': unit,
-                        'conc_unit': conc_unit
+                        'conc_unit': conc_unit,
+                        # Display strings, formatted once per calculation
+                        'stock_needed_fmt': f"{stock_needed:.2f} {unit}",
+                        'water_fmt': f"{water_needed:.2f} {unit}",
+                        'final_amount_fmt': f"{final_amount:.2f} {unit}",
+                        # (Parameter, Value, Unit) rows shared by the PDF and Excel reports
+                        'records': (
+                            ('Final Amount', f"{final_amount:.2f}", unit),
+                            ('Final Concentration', f"{final_conc:.2f}", conc_unit),
+                            ('Stock Solution Used', f"{stock_needed:.2f}", unit),
+                            ('Water Added', f"{water_needed:.2f}", unit)
+                        )
                     }
                     st.session_state.step2_completed = True
         
@@ -567,11 +639,11 @@ def main():
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Stock Solution Needed", f"{calc['stock_needed']:.2f} {unit}")
+                st.metric("Stock Solution Needed", calc['stock_needed_fmt'])
             with col2:
-                st.metric("Water to Add", f"{calc['water_needed']:.2f} {unit}")
+                st.metric("Water to Add", calc['water_fmt'])
             with col3:
-                st.metric("Final Volume", f"{calc['final_amount']:.2f} {unit}")
+                st.metric("Final Volume", calc['final_amount_fmt'])
             
             # Instructions
             st.markdown("##### 📋 Dilution Instructions")
@@ -581,8 +653,8 @@ def main():
 
             st.markdown(f"""
             1. **Select bottle**: Use a Nalgene bottle with at least **{bottle_volume:.0f}** ml capacity.  
-            2. **Add water first**: Pour **{calc['water_needed']:.2f} {unit}** of alkaline water into the bottle.  
-            3. **Stock solution**:add **{calc['stock_needed']:.2f} {unit}** of stock solution into the bottle. 
+            2. **Add water first**: Pour **{calc['water_fmt']}** of alkaline water into the bottle.  
+            3. **Stock solution**:add **{calc['stock_needed_fmt']}** of stock solution into the bottle. 
             4. **Seal & mix**: Tighten the lid securely and shake **vigorously** until fully homogeneous.  
             5. **Use immediately**: Once mixed, transfer into a **{calc['stock_needed']:.0f}** ml bottle place the lid, label and use in this session (do not store overnight).
             """)
@@ -600,20 +672,10 @@ def main():
         stock = st.session_state.stock_calculations
         final = st.session_state.dilution_calculations
         
-        summary_df = pd.DataFrame({
-            "Parameter": [
-                "Stock Amount", "Stock Concentration", "Emulsion Required", "Water for Stock",
-                "Final Amount", "Final Concentration", "Stock Solution Used", "Water for Dilution"
-            ],
-            "Value": [
-                f"{stock['stock_amount']:.2f} {unit}", f"{stock['stock_conc']:.2f} {conc_unit}",
-                f"{stock['emulsion_needed']:.2f} {unit}", f"{stock['water_needed']:.2f} {unit}",
-                f"{final['final_amount']:.2f} {unit}", f"{final['final_conc']:.2f} {conc_unit}",
-                f"{final['stock_needed']:.2f} {unit}", f"{final['water_needed']:.2f} {unit}"
-            ]
-        })
+        summary_rows = _build_summary_rows(stock['records'], final['records'])
         
-        st.dataframe(summary_df, use_container_width=True)
+        st.dataframe(pd.DataFrame(summary_rows, columns=["Parameter", "Value"]),
+                     use_container_width=True)
         
         # Material balance check
         st.markdown("##### ⚖️ Material Balance Check")
@@ -623,36 +685,67 @@ def main():
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Stock Available", f"{stock_available:.2f} {unit}")
+            st.metric("Stock Available", stock['stock_amount_fmt'])
         with col2:
-            st.metric("Stock Used", f"{stock_used:.2f} {unit}")
+            st.metric("Stock Used", final['stock_needed_fmt'])
         with col3:
             st.metric("Stock Remaining", f"{stock_remaining:.2f} {unit}")
         
         # Download section
         st.markdown("#### 📥 Download Reports")
         
+        # Generated reports are kept in session state, keyed by their inputs,
+        # so a download click or the other Generate button doesn't hide them
+        export_key = (stock['records'], final['records'],
+                      st.session_state.mode, st.session_state.unit_type)
         col1, col2 = st.columns(2)
         
         with col1:
             if st.button("Generate PDF Report", type="secondary"):
                 with st.spinner("Generating PDF..."):
-                    pdf_link = generate_pdf(
+                    generated_at = get_export_timestamp(export_key)
+                    pdf_bytes = generate_pdf(
                         "Flocculant Preparation Report", 
                         stock, 
                         final, 
-                        summary_df, 
-                        st.session_state.mode
+                        summary_rows, 
+                        st.session_state.mode,
+                        generated_at.strftime('%Y-%m-%d %H:%M:%S')
                     )
-                    if pdf_link:
-                        st.markdown(pdf_link, unsafe_allow_html=True)
+                    if pdf_bytes:
+                        st.session_state.pdf_export = (
+                            export_key, pdf_bytes,
+                            f"flocculant_report_{generated_at:%Y%m%d_%H%M%S}.pdf"
+                        )
+            
+            pdf_export = st.session_state.get("pdf_export")
+            if pdf_export and pdf_export[0] == export_key:
+                st.download_button(
+                    "📄 Download PDF Report",
+                    data=pdf_export[1],
+                    file_name=pdf_export[2],
+                    mime="application/pdf"
+                )
         
         with col2:
             if st.button("Generate Excel Report", type="secondary"):
                 with st.spinner("Generating Excel..."):
-                    excel_link = generate_excel(summary_df, stock, final)
-                    if excel_link:
-                        st.markdown(excel_link, unsafe_allow_html=True)
+                    excel_bytes = generate_excel(summary_rows, stock, final)
+                    if excel_bytes:
+                        generated_at = get_export_timestamp(export_key)
+                        st.session_state.excel_export = (
+                            export_key, excel_bytes,
+                            f"flocculant_summary_{generated_at:%Y%m%d_%H%M%S}.xlsx"
+                        )
+            
+            excel_export = st.session_state.get("excel_export")
+            if excel_export and excel_export[0] == export_key:
+                st.download_button(
+                    "📊 Download Excel Summary",
+                    data=excel_export[1],
+                    file_name=excel_export[2],
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file